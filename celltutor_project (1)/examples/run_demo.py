@@ -10,7 +10,7 @@ def main():
     vis = MockVisualizer()
     reg = Registry()
     builder = CellAgentBuilder(llm, vis, reg)
-    runtime = CellAgentRuntime(reg, llm)
+    runtime = CellAgentRuntime(reg, llm, vis)
 
     code1 = textwrap.dedent("""
     def factorial(n):
@@ -6,4 +6,5 @@ setup(
     packages=find_packages("src"),
     package_dir={"": "src"},
     install_requires=["pillow"],
+    extras_require={"speedups": ["orjson", "zstandard"]},
 )
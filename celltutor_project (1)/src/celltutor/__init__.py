@@ -10,15 +10,24 @@ Contains:
 - Demo script entrypoints available under examples/run_demo.py
 """
 
+import asyncio
+import functools
 import os
 import sqlite3
-import uuid
+import threading
+import weakref
+import itertools
 import time
 import json
 import ast
+import hashlib
+import importlib.util
+import re
 import textwrap
 import logging
-from typing import Dict, Any, List, Optional
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
 
 # Config
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
@@ -33,147 +42,434 @@ logging.basicConfig(
 )
 logger = logging.getLogger("celltutor")
 
+# orjson is an optional, faster drop-in for manifest (de)serialization
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def dumps_json(obj: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj)
+
+def loads_json(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+# zstandard is optional; without it manifests are stored as plain JSON text
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
 def now_ts():
     return time.time()
 
+# ids are a random per-process prefix plus a counter: unique across runs sharing
+# celltutor.db, without an os.urandom() syscall per id
+_ID_PREFIX = os.urandom(4).hex()
+_ID_COUNTER = itertools.count()
+
+def _reseed_ids():
+    global _ID_PREFIX, _ID_COUNTER
+    _ID_PREFIX = os.urandom(4).hex()
+    _ID_COUNTER = itertools.count()
+
+if hasattr(os, "register_at_fork"):
+    # a forked child would otherwise repeat its parent's ids
+    os.register_at_fork(after_in_child=_reseed_ids)
+
 def gen_id():
-    return str(uuid.uuid4())[:8]
+    return f"{_ID_PREFIX}{next(_ID_COUNTER):04x}"
 
 class LLMInterface:
     def generate(self, prompt: str, **kwargs) -> str:
         raise NotImplementedError
 
+    def generate_batch(self, prompts: List[str], **kwargs) -> List[str]:
+        # adapters with a batch endpoint override this to answer all prompts in one request
+        return [self.generate(p, **kwargs) for p in prompts]
+
+    async def generate_async(self, prompt: str, **kwargs) -> str:
+        # runs the blocking generate() in the loop's executor; network adapters override
+        # this with a native async client
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(self.generate, prompt, **kwargs))
+
+# every MockLLM keyword in one case-insensitive pattern; group order is branch priority
+_PROMPT_KINDS = ("summary", "line", "quiz", "visual")
+_CLASSIFIER = re.compile(
+    r"(?P<summary>summary:|summarize)|(?P<line>explain line|line-by-line)|(?P<quiz>quiz)|(?P<visual>visualize|diagram)",
+    re.IGNORECASE,
+)
+
+# MockLLM's fixed replies, serialized once
+_QUIZ_CANNED = json.dumps([
+    {"q": "What does the function return?", "type": "short", "answer_hint": "It returns an int"},
+    {"q": "Is there a loop in the code?", "type": "mcq", "options": ["Yes", "No"], "answer_hint": "Yes"}
+])
+_DIAGRAM_CANNED = "visual_instructions: draw a control-flow box for the function and label variables x, y"
+
+def _classify_prompt(prompt: str) -> Optional[str]:
+    found = set()
+    for m in _CLASSIFIER.finditer(prompt):
+        if m.lastgroup == _PROMPT_KINDS[0]:
+            return m.lastgroup
+        found.add(m.lastgroup)
+    for kind in _PROMPT_KINDS:
+        if kind in found:
+            return kind
+    return None
+
 class MockLLM(LLMInterface):
     def generate(self, prompt: str, **kwargs) -> str:
-        p = prompt.lower()
-        if "summary:" in p or "summarize" in p:
+        kind = _classify_prompt(prompt)
+        if kind == "summary":
             s = " ".join(prompt.strip().split())[:200]
             return f"Quick summary: {s}"
-        if "explain line" in p or "line-by-line" in p:
+        if kind == "line":
             lines = [l.strip() for l in prompt.splitlines() if l.strip()]
             out = []
             for i, ln in enumerate(lines[:10], 1):
                 out.append(f"Line {i}: {ln[:80]} -> Explanation: This line ...")
             return "\\n".join(out)
-        if "generate quiz" in p or "quiz" in p:
-            return json.dumps([
-                {"q": "What does the function return?", "type": "short", "answer_hint": "It returns an int"},
-                {"q": "Is there a loop in the code?", "type": "mcq", "options": ["Yes", "No"], "answer_hint": "Yes"}
-            ])
-        if "visualize" in p or "diagram" in p:
-            return "visual_instructions: draw a control-flow box for the function and label variables x, y"
+        if kind == "quiz":
+            return _QUIZ_CANNED
+        if kind == "visual":
+            return _DIAGRAM_CANNED
         return "MOCK_LLM_REPLY: " + (prompt.strip()[:180])
 
-# Visualizer uses Pillow for placeholder images
-try:
-    from PIL import Image, ImageDraw
-except Exception:
-    Image = None
+    async def generate_async(self, prompt: str, **kwargs) -> str:
+        # no I/O to wait on, so skip the executor hop
+        return self.generate(prompt, **kwargs)
+
+# Visualizer uses Pillow for placeholder images. Pillow is only looked up here and
+# imported on first use, so importing celltutor doesn't pay for it.
+_HAS_PIL = importlib.util.find_spec("PIL") is not None
+
+def _pil():
+    from PIL import Image, ImageDraw  # served from sys.modules after the first call
+    return Image, ImageDraw
+
+@functools.lru_cache(maxsize=None)
+def _has_webp() -> bool:
+    from PIL import features
+    return features.check_module("webp")
+
+def _render_frame(i_t):
+    Image, ImageDraw = _pil()
+    i, t = i_t
+    img = Image.new("RGB", (640, 240), color=(255,255,255))
+    d = ImageDraw.Draw(img)
+    d.text((10,10), f"Frame {i+1}: {t[:200]}", fill=(0,0,0))
+    return img
+
+# every MockVisualizer, so a runtime created without one can still wait for background writes
+_LIVE_VISUALIZERS: "weakref.WeakSet[MockVisualizer]" = weakref.WeakSet()
+_LIVE_VISUALIZERS_LOCK = threading.Lock()
 
 class MockVisualizer:
+    def __init__(self, max_workers: int = 4):
+        with _LIVE_VISUALIZERS_LOCK:
+            _LIVE_VISUALIZERS.add(self)
+        # Pillow releases the GIL while drawing, so frames render in parallel
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+        # images are drawn and saved in the background; make_* return the target path at once
+        self._writer = ThreadPoolExecutor(max_workers=2)
+        # _pending/_failed are updated from writer threads, so guard them like Registry does
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Future] = {}
+        self._failed: Dict[str, BaseException] = {}
+
+    def _submit(self, path: str, fn, *args) -> str:
+        fut = self._writer.submit(fn, path, *args)
+        with self._lock:
+            self._pending[path] = fut
+        # outside the lock: the callback runs inline if the write already finished
+        fut.add_done_callback(lambda f: self._finished(path, f))
+        return path
+
+    def _finished(self, path: str, fut: Future):
+        exc = fut.exception()
+        if exc is not None:
+            logger.error(f"Failed to write {path}: {exc}")
+        with self._lock:
+            # recorded before the future is dropped, so wait() always sees the failure
+            if exc is not None:
+                self._failed[path] = exc
+            self._pending.pop(path, None)
+
+    def wait(self, path: str):
+        """Block until a pending background write of `path` has finished; re-raise if it failed."""
+        with self._lock:
+            fut = self._pending.get(path)
+        if fut is not None:
+            fut.result()
+        with self._lock:
+            exc = self._failed.get(path)
+        if exc is not None:
+            raise exc
+
+    def close(self):
+        """Finish pending writes and stop the worker threads."""
+        # writer first: its animation tasks still render frames on _pool
+        self._writer.shutdown(wait=True)
+        self._pool.shutdown(wait=True)
+        with self._lock:
+            self._failed.clear()
+
     def make_diagram(self, cell_id: str, diagram_text: str) -> str:
         path = os.path.join(AGENTS_DIR, f"{cell_id}_diagram.png")
-        if Image is None:
+        if not _HAS_PIL:
             # fallback: write text file
             with open(path + ".txt", "w") as fh:
                 fh.write("DIAGRAM PLACEHOLDER\\n" + diagram_text)
             return path + ".txt"
+        return self._submit(path, self._write_diagram, diagram_text)
+
+    def _write_diagram(self, path: str, diagram_text: str):
+        Image, ImageDraw = _pil()
         img = Image.new("RGB", (800, 200), color=(240, 240, 240))
         d = ImageDraw.Draw(img)
         text = "DIAGRAM:\\n" + (diagram_text[:800])
         d.text((10, 10), text, fill=(0,0,0))
-        img.save(path)
-        return path
+        # write then rename, so a path that exists is always a complete image
+        img.save(path + ".tmp", format="PNG")
+        os.replace(path + ".tmp", path)
 
     def make_animation(self, cell_id: str, frames_text: List[str]) -> str:
-        path = os.path.join(AGENTS_DIR, f"{cell_id}_anim.gif")
-        if Image is None:
+        # WebP encodes faster and smaller than palette-quantized GIF; GIF if libwebp is missing
+        ext = "webp" if _HAS_PIL and _has_webp() else "gif"
+        path = os.path.join(AGENTS_DIR, f"{cell_id}_anim.{ext}")
+        if not _HAS_PIL:
             with open(path + ".txt", "w") as fh:
                 fh.write("ANIM PLACEHOLDER\\n" + "\\n".join(frames_text))
             return path + ".txt"
-        frames = []
-        for i, t in enumerate(frames_text):
-            img = Image.new("RGB", (640, 240), color=(255,255,255))
-            d = ImageDraw.Draw(img)
-            d.text((10,10), f"Frame {i+1}: {t[:200]}", fill=(0,0,0))
-            frames.append(img)
-        frames[0].save(path, save_all=True, append_images=frames[1:], duration=800, loop=0)
-        return path
+        return self._submit(path, self._write_animation, frames_text)
+
+    def _write_animation(self, path: str, frames_text: List[str]):
+        frames = list(self._pool.map(_render_frame, enumerate(frames_text)))
+        if path.endswith(".webp"):
+            frames[0].save(path + ".tmp", format="WEBP", save_all=True, append_images=frames[1:], duration=800,
+                           loop=0, lossless=False, quality=60, method=0)
+        else:
+            frames[0].save(path + ".tmp", format="GIF", save_all=True, append_images=frames[1:], duration=800,
+                           loop=0)
+        os.replace(path + ".tmp", path)
 
 class Registry:
+    # fixed statement text so sqlite3's per-connection statement cache reuses the prepared plans
+    _SQL_INSERT_AGENT = "INSERT INTO cell_agents (id,cell_index,manifest,created_at) VALUES (?,?,?,?)"
+    _SQL_GET_MANIFEST = "SELECT manifest FROM cell_agents WHERE id=?"
+    _SQL_INSERT_ATTEMPT = "INSERT INTO attempts (id,cell_id,ts,quiz_result_json) VALUES (?,?,?,?)"
+
+    _MANIFEST_CACHE_SIZE = 1024
+
     def __init__(self, db_path: str = DB_PATH):
         self.db_path = db_path
+        # manifests are write-once, so a decoded copy can be served without hitting SQLite (LRU)
+        self._manifest_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # one long-lived connection per registry; autocommit mode, writes serialized by _lock
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        self._lock = threading.Lock()
+        # reusable codec contexts; zstandard contexts are not thread-safe, so use them under _lock
+        if zstandard is not None:
+            self._compressor = zstandard.ZstdCompressor(level=3)
+            self._decompressor = zstandard.ZstdDecompressor()
+        else:
+            self._compressor = self._decompressor = None
         self._init_db()
 
     def _init_db(self):
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-        cur.execute(\"\"\"
-            CREATE TABLE IF NOT EXISTS cell_agents (
-                id TEXT PRIMARY KEY,
-                cell_index INTEGER,
-                manifest TEXT,
-                created_at REAL
-            )
-        \"\"\")
-        cur.execute(\"\"\"
-            CREATE TABLE IF NOT EXISTS attempts (
-                id TEXT PRIMARY KEY,
-                cell_id TEXT,
-                ts REAL,
-                quiz_result_json TEXT
-            )
-        \"\"\")
-        conn.commit()
-        conn.close()
+        with self._lock:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS cell_agents (
+                    id TEXT PRIMARY KEY,
+                    cell_index INTEGER,
+                    manifest BLOB,
+                    created_at REAL
+                )
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS attempts (
+                    id TEXT PRIMARY KEY,
+                    cell_id TEXT,
+                    ts REAL,
+                    quiz_result_json TEXT
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_attempts_cell_ts ON attempts(cell_id, ts DESC)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_cell_agents_index ON cell_agents(cell_index)")
+
+    @staticmethod
+    def _serialize(manifest: Dict[str, Any]) -> bytes:
+        return orjson.dumps(manifest) if orjson is not None else dumps_json(manifest).encode()
+
+    def _encode_manifest(self, data: bytes):
+        """Column value for serialized manifest JSON: a zstd BLOB, or JSON text without zstandard."""
+        if self._compressor is None:
+            return data.decode()
+        return self._compressor.compress(data)
+
+    def _decompress_manifest(self, raw):
+        # rows written before compression was enabled are plain JSON text
+        if isinstance(raw, bytes) and raw[:4] == _ZSTD_MAGIC:
+            if self._decompressor is None:
+                raise RuntimeError("Manifest is zstd-compressed but the zstandard package is not installed")
+            with self._lock:
+                raw = self._decompressor.decompress(raw)
+        return raw
+
+    def _cache_put(self, cell_id: str, data):
+        # the cache holds serialized JSON, so every hit decodes a private copy for its caller
+        with self._lock:
+            self._manifest_cache[cell_id] = data
+            self._manifest_cache.move_to_end(cell_id)
+            if len(self._manifest_cache) > self._MANIFEST_CACHE_SIZE:
+                self._manifest_cache.popitem(last=False)
+
+    def _cache_get(self, cell_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            data = self._manifest_cache.get(cell_id)
+            if data is None:
+                return None
+            self._manifest_cache.move_to_end(cell_id)
+        return loads_json(data)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
 
     def register(self, cell_index: int, manifest: Dict[str, Any]) -> str:
         cid = manifest.get("id") or gen_id()
         manifest["id"] = cid
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-        cur.execute("INSERT INTO cell_agents (id,cell_index,manifest,created_at) VALUES (?,?,?,?)",
-                    (cid, cell_index, json.dumps(manifest), now_ts()))
-        conn.commit()
-        conn.close()
+        data = self._serialize(manifest)
+        with self._lock:
+            self.conn.execute(self._SQL_INSERT_AGENT,
+                              (cid, cell_index, self._encode_manifest(data), now_ts()))
+        self._cache_put(cid, data)
         logger.info(f"Registered cell agent {cid} for cell {cell_index}")
         return cid
 
+    def register_many(self, items: List[Tuple[int, Dict[str, Any]]]) -> List[str]:
+        for _, manifest in items:
+            manifest["id"] = manifest.get("id") or gen_id()
+        # one transaction (and one commit) for the whole batch
+        serialized = [(m["id"], cell_index, self._serialize(m)) for cell_index, m in items]
+        with self._lock, self.conn:
+            rows = [(cid, cell_index, self._encode_manifest(data), now_ts()) for cid, cell_index, data in serialized]
+            self.conn.execute("BEGIN")
+            self.conn.executemany(self._SQL_INSERT_AGENT, rows)
+        for cid, _, data in serialized:
+            self._cache_put(cid, data)
+        logger.info(f"Registered {len(rows)} cell agents")
+        return [r[0] for r in rows]
+
     def get_manifest(self, cell_id: str) -> Optional[Dict[str,Any]]:
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-        cur.execute("SELECT manifest FROM cell_agents WHERE id=?", (cell_id,))
-        r = cur.fetchone()
-        conn.close()
-        if not r: return None
-        return json.loads(r[0])
+        cached = self._cache_get(cell_id)
+        if cached is not None:
+            return cached
+        # under _lock, so a read can't see rows of a bulk write that hasn't committed yet
+        with self._lock:
+            row = self.conn.execute(self._SQL_GET_MANIFEST, (cell_id,)).fetchone()
+        if not row: return None
+        data = self._decompress_manifest(row["manifest"])
+        self._cache_put(cell_id, data)
+        return loads_json(data)
 
     def store_attempt(self, cell_id: str, result: Dict[str,Any]) -> str:
         aid = gen_id()
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-        cur.execute("INSERT INTO attempts (id,cell_id,ts,quiz_result_json) VALUES (?,?,?,?)",
-                    (aid, cell_id, now_ts(), json.dumps(result)))
-        conn.commit()
-        conn.close()
+        with self._lock:
+            self.conn.execute(self._SQL_INSERT_ATTEMPT,
+                              (aid, cell_id, now_ts(), dumps_json(result)))
         logger.info(f"Stored attempt {aid} for cell {cell_id}")
         return aid
 
+    def store_attempts(self, cell_id: str, results: List[Dict[str,Any]]) -> List[str]:
+        ts = now_ts()
+        rows = [(gen_id(), cell_id, ts, dumps_json(r)) for r in results]
+        with self._lock, self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(self._SQL_INSERT_ATTEMPT, rows)
+        logger.info(f"Stored {len(rows)} attempts for cell {cell_id}")
+        return [r[0] for r in rows]
+
+class _InspectCollector:
+    """Collects functions, loops and imports for Inspector.extract_summary in one tree walk."""
+    def __init__(self):
+        self.funcs: List[str] = []
+        self.imports: List[str] = []
+        self.has_loop = False
+
+    def _function(self, n):
+        self.funcs.append(n.name)
+
+    def _loop(self, n):
+        self.has_loop = True
+
+    def _import(self, n):
+        self.imports.append(n.names[0].name)
+
+    def _import_from(self, n):
+        if n.module:
+            self.imports.append(n.module)
+
+    # node type -> handler, so each node costs one dict lookup instead of a type-check chain
+    _DISPATCH = {
+        ast.FunctionDef: _function,
+        ast.For: _loop,
+        ast.While: _loop,
+        ast.Import: _import,
+        ast.ImportFrom: _import_from,
+    }
+
+    def run(self, tree: ast.AST) -> "_InspectCollector":
+        dispatch = self._DISPATCH
+        for n in ast.walk(tree):
+            handler = dispatch.get(type(n))
+            if handler is not None:
+                handler(self, n)
+        return self
+
+# parsed trees of recently seen cells, keyed by a 64-bit hash of the source (LRU)
+_AST_CACHE_SIZE = 512
+_AST_CACHE: "OrderedDict[bytes, ast.AST]" = OrderedDict()
+_AST_CACHE_LOCK = threading.Lock()
+
+def _parse_cached(code: str) -> ast.AST:
+    key = hashlib.blake2b(code.encode("utf-8", "surrogatepass"), digest_size=8).digest()
+    with _AST_CACHE_LOCK:
+        tree = _AST_CACHE.get(key)
+        if tree is not None:
+            _AST_CACHE.move_to_end(key)
+            return tree
+    tree = ast.parse(code)
+    with _AST_CACHE_LOCK:
+        _AST_CACHE[key] = tree
+        if len(_AST_CACHE) > _AST_CACHE_SIZE:
+            _AST_CACHE.popitem(last=False)
+    return tree
+
 class Inspector:
     @staticmethod
     def extract_summary(code: str) -> Dict[str,Any]:
         try:
-            tree = ast.parse(code)
+            tree = _parse_cached(code)
         except Exception as e:
             return {"error": "not python or parse error", "raw_code": code[:200]}
-        funcs = [n.name for n in ast.walk(tree) if isinstance(n, ast.FunctionDef)]
-        loops = any(isinstance(n, (ast.For, ast.While)) for n in ast.walk(tree))
-        imports = [n.names[0].name for n in ast.walk(tree) if isinstance(n, ast.Import)]
-        imports += [n.module for n in ast.walk(tree) if isinstance(n, ast.ImportFrom) and n.module]
+        v = _InspectCollector().run(tree)
         return {
-            "functions": funcs,
-            "has_loop": loops,
-            "imports": list(set([i for i in imports if i])),
+            "functions": v.funcs,
+            "has_loop": v.has_loop,
+            "imports": list(dict.fromkeys(i for i in v.imports if i)),
             "lines": [ln for ln in code.splitlines() if ln.strip()]
         }
 
@@ -183,26 +479,35 @@ class CellAgentBuilder:
         self.visualizer = visualizer
         self.registry = registry
 
-    def build_for_cell(self, cell_index: int, code: str, title: Optional[str]=None) -> Dict[str,Any]:
-        inspect = Inspector.extract_summary(code)
-        name = title or f"CellAgent_{cell_index}"
-        summary_prompt = f"Summary:\\nCode:\\n{code}\\n\\nProvide a concise summary."
-        summary = self.llm.generate(summary_prompt)
+    @staticmethod
+    def _prompts(code: str, inspect: Dict[str,Any]) -> List[str]:
+        # same cap as ask_question's context; one shared copy instead of the full code in each prompt
+        code_trunc = code[:2000]
+        summary_prompt = f"Summary:\\nCode:\\n{code_trunc}\\n\\nProvide a concise summary."
         line_prompt = "Line-by-line explanation:\\n" + "\\n".join(inspect.get("lines", [])[:20])
-        line_by_line = self.llm.generate(line_prompt)
-        vis_prompt = "Visualize the following code:\\n\\n" + code + "\\n\\nSuggest a diagram and steps."
-        vis_instructions = self.llm.generate(vis_prompt)
-        diagram_path = self.visualizer.make_diagram(gen_id(), vis_instructions)
+        vis_prompt = f"Visualize the following code:\\n\\n{code_trunc}\\n\\nSuggest a diagram and steps."
+        quiz_prompt = "Generate a 1-3 question quiz based on this code. Return JSON list of questions."
+        return [summary_prompt, line_prompt, vis_prompt, quiz_prompt]
+
+    def _make_manifest(self, cell_index: int, code: str, title: Optional[str],
+                       inspect: Dict[str,Any], responses: List[str]) -> Dict[str,Any]:
+        summary, line_by_line, vis_instructions, quiz_json = responses
         frames = [f"State {i+1}: explain variable changes" for i in range(3)]
+        # both return immediately; the images are written in the background
+        diagram_path = self.visualizer.make_diagram(gen_id(), vis_instructions)
         anim_path = self.visualizer.make_animation(gen_id(), frames)
-        quiz_prompt = "Generate a 1-3 question quiz based on this code. Return JSON list of questions."
-        quiz_json = self.llm.generate(quiz_prompt)
         try:
-            quiz = json.loads(quiz_json)
+            quiz = loads_json(quiz_json)
         except Exception:
+            quiz = None
+        if not isinstance(quiz, list):
             quiz = [{"q": "What does the code do?", "type": "short", "answer_hint": "describe"}]
-        manifest = {
-            "name": name,
+        # lower-case hints once here instead of on every graded answer
+        for q in quiz:
+            if isinstance(q, dict) and isinstance(q.get("answer_hint"), str):
+                q["_hint_lower"] = q["answer_hint"].lower()
+        return {
+            "name": title or f"CellAgent_{cell_index}",
             "cell_index": cell_index,
             "code_sample": code,
             "inspection": inspect,
@@ -213,14 +518,87 @@ class CellAgentBuilder:
             "quiz": quiz,
             "created_at": now_ts()
         }
+
+    def wait_for_visuals(self, manifest: Dict[str,Any]):
+        """Block until the manifest's diagram and animation files are written (re-raises write errors)."""
+        for key in ("diagram", "animation"):
+            if manifest.get(key):
+                self.visualizer.wait(manifest[key])
+
+    def build_for_cell(self, cell_index: int, code: str, title: Optional[str]=None) -> Dict[str,Any]:
+        inspect = Inspector.extract_summary(code)
+        responses = self.llm.generate_batch(self._prompts(code, inspect))
+        manifest = self._make_manifest(cell_index, code, title, inspect, responses)
         cid = self.registry.register(cell_index, manifest)
         manifest["id"] = cid
         return manifest
 
+    @staticmethod
+    def _plan_many(cells: List[Tuple[int, str]], titles: Optional[List[Optional[str]]]):
+        """Inspect every cell and return (titles, inspections, per-cell prompt lists)."""
+        if titles is None:
+            titles = [None] * len(cells)
+        elif len(titles) != len(cells):
+            raise ValueError(f"Got {len(titles)} titles for {len(cells)} cells")
+        inspections = [Inspector.extract_summary(code) for _, code in cells]
+        prompt_groups = [CellAgentBuilder._prompts(code, inspect) for (_, code), inspect in zip(cells, inspections)]
+        return titles, inspections, prompt_groups
+
+    def _make_manifests(self, cells: List[Tuple[int, str]], titles: List[Optional[str]],
+                        inspections: List[Dict[str,Any]], prompt_groups: List[List[str]],
+                        responses: List[str]) -> List[Dict[str,Any]]:
+        manifests, start = [], 0
+        for (cell_index, code), title, inspect, group in zip(cells, titles, inspections, prompt_groups):
+            manifests.append(self._make_manifest(cell_index, code, title, inspect,
+                                                 responses[start:start + len(group)]))
+            start += len(group)
+        return manifests
+
+    def build_for_many(self, cells: List[Tuple[int, str]],
+                       titles: Optional[List[Optional[str]]] = None) -> List[Dict[str,Any]]:
+        """Build agents for many cells with one LLM batch and one registry transaction."""
+        titles, inspections, prompt_groups = self._plan_many(cells, titles)
+        responses = self.llm.generate_batch([p for group in prompt_groups for p in group])
+        manifests = self._make_manifests(cells, titles, inspections, prompt_groups, responses)
+        self.registry.register_many([(m["cell_index"], m) for m in manifests])
+        return manifests
+
+    async def _gather_responses(self, prompts: List[str], max_concurrency: Optional[int]) -> List[str]:
+        if max_concurrency is None:
+            return list(await asyncio.gather(*(self.llm.generate_async(p) for p in prompts)))
+        sem = asyncio.Semaphore(max_concurrency)
+
+        async def limited(p):
+            async with sem:
+                return await self.llm.generate_async(p)
+        return list(await asyncio.gather(*(limited(p) for p in prompts)))
+
+    async def build_for_cell_async(self, cell_index: int, code: str, title: Optional[str]=None) -> Dict[str,Any]:
+        inspect = Inspector.extract_summary(code)
+        responses = await self._gather_responses(self._prompts(code, inspect), None)
+        manifest = self._make_manifest(cell_index, code, title, inspect, responses)
+        loop = asyncio.get_running_loop()
+        cid = await loop.run_in_executor(None, self.registry.register, cell_index, manifest)
+        manifest["id"] = cid
+        return manifest
+
+    async def build_for_many_async(self, cells: List[Tuple[int, str]],
+                                   titles: Optional[List[Optional[str]]] = None,
+                                   max_concurrency: Optional[int] = None) -> List[Dict[str,Any]]:
+        """Async build_for_many: all LLM calls for every cell run concurrently (optionally capped by
+        max_concurrency to respect provider rate limits), then one bulk registry write."""
+        titles, inspections, prompt_groups = self._plan_many(cells, titles)
+        responses = await self._gather_responses([p for group in prompt_groups for p in group], max_concurrency)
+        manifests = self._make_manifests(cells, titles, inspections, prompt_groups, responses)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.registry.register_many, [(m["cell_index"], m) for m in manifests])
+        return manifests
+
 class CellAgentRuntime:
-    def __init__(self, registry: Registry, llm: LLMInterface):
+    def __init__(self, registry: Registry, llm: LLMInterface, visualizer: Optional[MockVisualizer] = None):
         self.registry = registry
         self.llm = llm
+        self.visualizer = visualizer
 
     def explain(self, cell_id: str, depth: str="summary") -> str:
         manifest = self.registry.get_manifest(cell_id)
@@ -234,24 +612,65 @@ class CellAgentRuntime:
 
     def get_visuals(self, cell_id: str) -> Dict[str,str]:
         m = self.registry.get_manifest(cell_id)
+        for path in (m.get("diagram"), m.get("animation")):
+            if path and not os.path.exists(path):
+                self._wait_for_visual(path)
         return {"diagram": m.get("diagram"), "animation": m.get("animation")}
 
+    def _wait_for_visual(self, path: str):
+        # visuals are written in the background; without an explicit visualizer, ask every live one
+        # (wait() returns at once for paths a visualizer doesn't own, and re-raises failed writes)
+        if self.visualizer is not None:
+            visualizers = [self.visualizer]
+        else:
+            with _LIVE_VISUALIZERS_LOCK:
+                visualizers = list(_LIVE_VISUALIZERS)
+        for vis in visualizers:
+            vis.wait(path)
+        if not os.path.exists(path):
+            logger.warning(f"Visual {path} does not exist")
+
     def ask_question(self, cell_id: str, user_question: str) -> str:
         m = self.registry.get_manifest(cell_id)
         context = m["code_sample"][:2000]
         prompt = f"User question: {user_question}\\nContext:\\n{context}\\nProvide a clear, concise answer."
         return self.llm.generate(prompt)
 
-    def run_quiz(self, cell_id: str, user_answers: List[Dict[str,Any]]) -> Dict[str,Any]:
-        manifest = self.registry.get_manifest(cell_id)
-        quiz = manifest.get("quiz", [])
+    @staticmethod
+    def _grade(hints: List[str], user_answers: List[Dict[str,Any]]) -> Dict[str,Any]:
         results = []
         for ans in user_answers:
             idx = ans["q_index"]
             user_ans = ans["answer"]
-            expected_hint = quiz[idx].get("answer_hint","").lower() if idx < len(quiz) else ""
+            expected_hint = hints[idx] if idx < len(hints) else ""
             correct = expected_hint in user_ans.lower() if expected_hint else True
             results.append({"index": idx, "user_answer": user_ans, "correct": correct})
-        summary = {"score": sum(1 for r in results if r["correct"]), "total": len(results), "details": results}
+        return {"score": sum(1 for r in results if r["correct"]), "total": len(results), "details": results}
+
+    @staticmethod
+    def _quiz_hints(manifest: Dict[str,Any]) -> List[str]:
+        hints = []
+        for q in manifest.get("quiz", []):
+            if not isinstance(q, dict):
+                hints.append("")
+            elif "_hint_lower" in q:
+                hints.append(q["_hint_lower"])
+            else:
+                # older manifests, or a hint that isn't a string (graded like a missing hint)
+                hint = q.get("answer_hint")
+                hints.append(hint.lower() if isinstance(hint, str) else "")
+        return hints
+
+    def run_quiz(self, cell_id: str, user_answers: List[Dict[str,Any]]) -> Dict[str,Any]:
+        manifest = self.registry.get_manifest(cell_id)
+        summary = self._grade(self._quiz_hints(manifest), user_answers)
         self.registry.store_attempt(cell_id, summary)
         return summary
+
+    def run_quiz_batch(self, cell_id: str, submissions: List[List[Dict[str,Any]]]) -> List[Dict[str,Any]]:
+        """Grade many submissions for one cell (e.g. a whole class) and store them in one transaction."""
+        manifest = self.registry.get_manifest(cell_id)
+        hints = self._quiz_hints(manifest)
+        summaries = [self._grade(hints, answers) for answers in submissions]
+        self.registry.store_attempts(cell_id, summaries)
+        return summaries
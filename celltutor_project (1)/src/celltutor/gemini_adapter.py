@@ -8,7 +8,7 @@ IMPORTANT: Do NOT commit API keys to the repository. Use repository secrets or e
 """
 
 import os
-from typing import Any, Dict
+from typing import Any, Dict, List
 from . import LLMInterface
 
 class GeminiAdapter(LLMInterface):
@@ -29,3 +29,22 @@ class GeminiAdapter(LLMInterface):
         # For now, provide a safe fallback message indicating the adapter was invoked.
         return f"[GeminiAdapter invoked with model={self.model}] " + (prompt[:100] + '...')
 
+    def generate_batch(self, prompts: List[str], **kwargs) -> List[str]:
+        # A real client should send all prompts in a single batch request so the
+        # per-cell prompts share one round-trip. Example pseudocode:
+        # resp = client.batch_generate_content(model=self.model,
+        #                                      requests=[{"prompt": p, **kwargs} for p in prompts])
+        # return [r.text for r in resp.responses]
+        return super().generate_batch(prompts, **kwargs)
+
+    async def generate_async(self, prompt: str, **kwargs) -> str:
+        # A real implementation should reuse one aiohttp.ClientSession for all calls, e.g.:
+        # if self._session is None:
+        #     self._session = aiohttp.ClientSession()
+        # url = f"https://generativelanguage.googleapis.com/v1beta/models/{self.model}:generateContent"
+        # async with self._session.post(url, params={"key": self.api_key},
+        #                               json={"contents": [{"parts": [{"text": prompt}]}]}) as resp:
+        #     data = await resp.json()
+        # return data["candidates"][0]["content"]["parts"][0]["text"]
+        # Until then, run the blocking generate() off the event loop like the base class does.
+        return await super().generate_async(prompt, **kwargs)
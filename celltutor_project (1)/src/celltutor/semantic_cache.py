@@ -0,0 +1,151 @@
+"""Semantic prompt cache for CellTutor.
+
+Opt-in wrapper around any LLMInterface (typically GeminiAdapter) that reuses an
+earlier response instead of calling the LLM again:
+
+- every prompt is cached by its exact text;
+- questions asked through CellAgentRuntime.ask_question are additionally matched
+  by meaning, but only against questions asked about the *same* context (the
+  cell code must be identical), so a rephrased question can reuse an answer
+  while a question about different code never can.
+
+Meaning is compared with sentence-transformers (all-MiniLM-L6-v2). Without it
+installed the cache is exact-match only; lexical similarity is not a safe
+stand-in (it can't tell "a + b" from "a - b" or "n is 0" from "n is 5").
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from . import LLMInterface
+
+try:
+    from sentence_transformers import SentenceTransformer
+except Exception:
+    SentenceTransformer = None
+
+# matches the prompt built by CellAgentRuntime.ask_question
+_QUESTION_RE = re.compile(r"User question: (?P<question>.*?)\\nContext:\\n(?P<context>.*)", re.DOTALL)
+
+def split_question_prompt(prompt: str) -> Optional[Tuple[str, str]]:
+    """Return (context, question) for ask_question prompts, None for anything else."""
+    m = _QUESTION_RE.match(prompt)
+    if m is None:
+        return None
+    return m.group("context"), m.group("question")
+
+class _MiniLMEmbedder:
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+        self.model = SentenceTransformer(model_name)
+
+    def embed(self, text: str):
+        return self.model.encode(text, normalize_embeddings=True)
+
+    @staticmethod
+    def similarity(a, b) -> float:
+        return float(a @ b)
+
+class SemanticCache(LLMInterface):
+    def __init__(self, llm: LLMInterface, threshold: float = 0.92, max_entries: int = 1024,
+                 max_per_context: int = 32, embedder: Optional[Any] = None,
+                 split_prompt: Callable[[str], Optional[Tuple[str, str]]] = split_question_prompt):
+        self.llm = llm
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_per_context = max_per_context
+        if embedder is None and SentenceTransformer is not None:
+            embedder = _MiniLMEmbedder()
+        self.embedder = embedder  # None: exact-match only
+        self.split_prompt = split_prompt
+        self._exact: "OrderedDict[str, str]" = OrderedDict()
+        # context hash -> recent (question embedding, response) pairs for that context
+        self._by_context: "OrderedDict[bytes, deque]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _fuzzy_key(self, prompt: str):
+        """Return (context key, question embedding), or None if the prompt is exact-match only."""
+        if self.embedder is None:
+            return None
+        parts = self.split_prompt(prompt)
+        if parts is None:
+            return None
+        context, question = parts
+        key = hashlib.blake2b(context.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+        return key, self.embedder.embed(question)
+
+    def _lookup(self, prompt: str):
+        """Return (response, fuzzy key); response is None on a miss."""
+        with self._lock:
+            hit = self._exact.get(prompt)
+            if hit is not None:
+                self._exact.move_to_end(prompt)
+                return hit, None
+        fuzzy = self._fuzzy_key(prompt)
+        if fuzzy is None:
+            return None, None
+        key, vec = fuzzy
+        best, best_score = None, self.threshold
+        with self._lock:
+            for cached_vec, response in self._by_context.get(key, ()):
+                score = self.embedder.similarity(vec, cached_vec)
+                if score >= best_score:
+                    best, best_score = response, score
+        return best, fuzzy
+
+    def _insert(self, prompt: str, fuzzy, response: str):
+        with self._lock:
+            self._exact[prompt] = response
+            self._exact.move_to_end(prompt)
+            if len(self._exact) > self.max_entries:
+                self._exact.popitem(last=False)
+            if fuzzy is None:
+                return
+            key, vec = fuzzy
+            bucket = self._by_context.get(key)
+            if bucket is None:
+                bucket = self._by_context[key] = deque(maxlen=self.max_per_context)
+            self._by_context.move_to_end(key)
+            bucket.append((vec, response))
+            if len(self._by_context) > self.max_entries:
+                self._by_context.popitem(last=False)
+
+    def generate(self, prompt: str, **kwargs) -> str:
+        if kwargs:
+            # sampling options change the output, so those calls are not cached
+            return self.llm.generate(prompt, **kwargs)
+        response, fuzzy = self._lookup(prompt)
+        if response is not None:
+            return response
+        response = self.llm.generate(prompt)
+        self._insert(prompt, fuzzy, response)
+        return response
+
+    async def generate_async(self, prompt: str, **kwargs) -> str:
+        if kwargs:
+            return await self.llm.generate_async(prompt, **kwargs)
+        response, fuzzy = self._lookup(prompt)
+        if response is not None:
+            return response
+        response = await self.llm.generate_async(prompt)
+        self._insert(prompt, fuzzy, response)
+        return response
+
+    def generate_batch(self, prompts: List[str], **kwargs) -> List[str]:
+        if kwargs:
+            return self.llm.generate_batch(prompts, **kwargs)
+        results: List[Optional[str]] = []
+        misses: Dict[str, Any] = {}
+        for p in prompts:
+            response, fuzzy = self._lookup(p)
+            results.append(response)
+            if response is None and p not in misses:
+                misses[p] = fuzzy
+        if misses:
+            # only the misses go to the wrapped LLM, still as a single batch
+            fresh = dict(zip(misses, self.llm.generate_batch(list(misses))))
+            for p, fuzzy in misses.items():
+                self._insert(p, fuzzy, fresh[p])
+            results = [r if r is not None else fresh[p] for p, r in zip(prompts, results)]
+        return results
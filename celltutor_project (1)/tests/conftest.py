@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+# run against the in-tree package without requiring `pip install -e .`
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
+
+import celltutor  # noqa: E402
+
+
+@pytest.fixture
+def agents_dir(tmp_path, monkeypatch):
+    path = tmp_path / "agents"
+    path.mkdir()
+    monkeypatch.setattr(celltutor, "AGENTS_DIR", str(path))
+    return path
+
+
+@pytest.fixture
+def registry(tmp_path):
+    reg = celltutor.Registry(str(tmp_path / "celltutor.db"))
+    yield reg
+    reg.close()
+
+
+@pytest.fixture
+def visualizer():
+    vis = celltutor.MockVisualizer()
+    yield vis
+    vis.close()
+
+
+@pytest.fixture
+def builder(registry, visualizer, agents_dir):
+    return celltutor.CellAgentBuilder(celltutor.MockLLM(), visualizer, registry)
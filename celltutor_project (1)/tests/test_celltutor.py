@@ -0,0 +1,172 @@
+import asyncio
+import os
+
+import pytest
+
+import celltutor
+from celltutor import semantic_cache
+from celltutor.semantic_cache import SemanticCache
+
+FACTORIAL = "def factorial(n):\n    res = 1\n    for i in range(1, n+1):\n        res *= i\n    return res"
+GREET = "def greet(name):\n    return f'Hello, {name}'"
+
+
+def _comparable(manifest):
+    # ids, timestamps and image paths differ between builds by design
+    return {k: v for k, v in manifest.items() if k not in ("id", "created_at", "diagram", "animation")}
+
+
+class QuizReplyLLM(celltutor.MockLLM):
+    """MockLLM whose quiz reply is fixed by the test."""
+    def __init__(self, quiz_reply):
+        self.quiz_reply = quiz_reply
+
+    def generate(self, prompt, **kwargs):
+        if prompt.startswith("Generate a 1-3 question quiz"):
+            return self.quiz_reply
+        return super().generate(prompt, **kwargs)
+
+
+class EchoLLM(celltutor.LLMInterface):
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, prompt, **kwargs):
+        self.calls += 1
+        return "answer to " + prompt
+
+
+# Registry
+
+def test_manifest_cache_hands_out_private_copies(registry, builder):
+    m = builder.build_for_cell(1, FACTORIAL)
+    summary = m["summary"]
+    m["summary"] = "changed by builder caller"
+    registry.get_manifest(m["id"])["summary"] = "changed by reader"
+    assert registry.get_manifest(m["id"])["summary"] == summary
+    fresh = celltutor.Registry(registry.db_path)
+    assert fresh.get_manifest(m["id"])["summary"] == summary
+    fresh.close()
+
+
+def test_manifest_cache_is_bounded(registry, monkeypatch):
+    monkeypatch.setattr(registry, "_MANIFEST_CACHE_SIZE", 2)
+    ids = [registry.register(i, {"value": i}) for i in range(5)]
+    assert len(registry._manifest_cache) == 2
+    assert registry.get_manifest(ids[0]) == {"value": 0, "id": ids[0]}
+
+
+def test_failed_bulk_register_leaves_nothing_readable(registry):
+    registry.register(0, {"id": "taken"})
+    with pytest.raises(Exception):
+        registry.register_many([(1, {"id": "fresh"}), (2, {"id": "taken"})])
+    assert registry.get_manifest("fresh") is None
+
+
+# Builder
+
+def test_build_for_many_matches_build_for_cell(builder):
+    single = [builder.build_for_cell(1, FACTORIAL, title="Factorial"), builder.build_for_cell(2, GREET)]
+    many = builder.build_for_many([(1, FACTORIAL), (2, GREET)], titles=["Factorial", None])
+    assert [_comparable(m) for m in many] == [_comparable(m) for m in single]
+    assert [_comparable(builder.registry.get_manifest(m["id"])) for m in many] == [_comparable(m) for m in single]
+
+
+def test_build_for_many_async_matches_build_for_cell(builder):
+    single = [builder.build_for_cell(1, FACTORIAL), builder.build_for_cell(2, GREET)]
+    many = asyncio.run(builder.build_for_many_async([(1, FACTORIAL), (2, GREET)], max_concurrency=2))
+    assert [_comparable(m) for m in many] == [_comparable(m) for m in single]
+
+
+@pytest.mark.parametrize("titles", [["only one"], ["a", "b", "c"]])
+def test_build_for_many_rejects_mismatched_titles(builder, titles):
+    cells = [(1, FACTORIAL), (2, GREET)]
+    with pytest.raises(ValueError):
+        builder.build_for_many(cells, titles=titles)
+    with pytest.raises(ValueError):
+        asyncio.run(builder.build_for_many_async(cells, titles=titles))
+
+
+@pytest.mark.parametrize("reply", ["null", '{"q": "not a list"}', "not json"])
+def test_non_list_quiz_reply_falls_back_to_default_quiz(registry, visualizer, agents_dir, reply):
+    builder = celltutor.CellAgentBuilder(QuizReplyLLM(reply), visualizer, registry)
+    m = builder.build_for_cell(1, GREET)
+    assert m["quiz"][0]["answer_hint"] == "describe"
+    assert registry.get_manifest(m["id"]) is not None
+
+
+def test_non_string_hints_do_not_crash_build_or_grading(registry, visualizer, agents_dir):
+    reply = '[{"q": "a", "answer_hint": null}, {"q": "b", "answer_hint": 3}, "loose", {"q": "c", "answer_hint": "Yes"}]'
+    builder = celltutor.CellAgentBuilder(QuizReplyLLM(reply), visualizer, registry)
+    m = builder.build_for_cell(1, GREET)
+    runtime = celltutor.CellAgentRuntime(registry, celltutor.MockLLM())
+    result = runtime.run_quiz(m["id"], [{"q_index": i, "answer": "no"} for i in range(4)])
+    assert [d["correct"] for d in result["details"]] == [True, True, True, False]
+
+
+# Runtime
+
+def test_run_quiz_batch_matches_run_quiz(registry, builder):
+    m = builder.build_for_cell(1, FACTORIAL)
+    runtime = celltutor.CellAgentRuntime(registry, celltutor.MockLLM())
+    submissions = [
+        [{"q_index": 0, "answer": "It returns an INT"}, {"q_index": 1, "answer": "yes"}],
+        [{"q_index": 0, "answer": "no idea"}, {"q_index": 1, "answer": "No"}],
+        [{"q_index": 7, "answer": "out of range"}],
+    ]
+    assert runtime.run_quiz_batch(m["id"], submissions) == [runtime.run_quiz(m["id"], s) for s in submissions]
+    count = registry.conn.execute("SELECT COUNT(*) FROM attempts WHERE cell_id=?", (m["id"],)).fetchone()[0]
+    assert count == 2 * len(submissions)
+
+
+def test_get_visuals_waits_without_runtime_visualizer(registry, builder):
+    pytest.importorskip("PIL")
+    m = builder.build_for_cell(1, FACTORIAL)
+    visuals = celltutor.CellAgentRuntime(registry, celltutor.MockLLM()).get_visuals(m["id"])
+    assert os.path.exists(visuals["diagram"]) and os.path.exists(visuals["animation"])
+
+
+def test_failed_background_write_is_reraised(registry, builder, monkeypatch, tmp_path):
+    pytest.importorskip("PIL")
+    monkeypatch.setattr(celltutor, "AGENTS_DIR", str(tmp_path / "missing"))
+    m = builder.build_for_cell(1, FACTORIAL)
+    with pytest.raises(FileNotFoundError):
+        builder.wait_for_visuals(m)
+    with pytest.raises(FileNotFoundError):
+        builder.visualizer.wait(m["diagram"])
+    with pytest.raises(FileNotFoundError):
+        celltutor.CellAgentRuntime(registry, celltutor.MockLLM()).get_visuals(m["id"])
+
+
+# SemanticCache
+
+def test_semantic_cache_without_embedder_is_exact_only(monkeypatch):
+    monkeypatch.setattr(semantic_cache, "SentenceTransformer", None)  # as when it is not installed
+    llm = EchoLLM()
+    cache = SemanticCache(llm)
+    assert cache.embedder is None
+    add = cache.generate("Summary:\\nCode:\\nreturn a + b")
+    sub = cache.generate("Summary:\\nCode:\\nreturn a - b")
+    assert add != sub
+    assert cache.generate("Summary:\\nCode:\\nreturn a + b") == add
+    assert llm.calls == 2
+
+
+class KeywordEmbedder:
+    """Stand-in for MiniLM: questions are 'similar' when they normalize to the same text."""
+    def embed(self, text):
+        return text.lower().rstrip("?").replace("explain this", "what does this do")
+
+    @staticmethod
+    def similarity(a, b):
+        return 1.0 if a == b else 0.0
+
+
+def test_semantic_cache_matches_questions_only_on_identical_code(registry):
+    f = registry.register(1, {"code_sample": FACTORIAL})
+    g = registry.register(2, {"code_sample": GREET})
+    runtime = celltutor.CellAgentRuntime(registry, SemanticCache(EchoLLM(), embedder=KeywordEmbedder()))
+    first = runtime.ask_question(f, "What does this do?")
+    assert runtime.ask_question(f, "explain this") == first
+    assert runtime.ask_question(g, "explain this") != first
+    assert runtime.ask_question(f, "What happens when n is 0?") != runtime.ask_question(f, "What happens when n is 5?")